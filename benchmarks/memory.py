@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 *-*
+
+"""	Measures the memory destinations take in check_activemq.py.
+
+	Against the stub Jolokia agent with a synthetic broker, reports per
+	10k destinations
+	 - the size of the decoded MBeans of all Queues with all attributes,
+	   as kept by the daemon's snapshot up to plugin version 0.7.2,
+	 - the size of the same MBeans read with only the attributes the
+	   modes use, and as Destination records, as kept now,
+	 - the resident memory of the serve daemon once it has read the
+	   broker, for this checkout or another one given by --plugin.
+	Sizes count every object once, shared strings included.
+
+	Example: ./benchmarks/memory.py --queues 10000
+	         ./benchmarks/memory.py --plugin /tmp/old/check_activemq.py """
+
+import argparse
+import imp
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib2
+
+from run import HERE, start_stub, path
+
+def deep_size(obj, seen=None):
+	""" Bytes of obj and all objects it refers to, each counted once. """
+	seen = set() if seen is None else seen
+	if id(obj) in seen:
+		return 0
+	seen.add(id(obj))
+	size = sys.getsizeof(obj)
+	if isinstance(obj, dict):
+		size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+	elif isinstance(obj, (list, tuple, set)):
+		size += sum(deep_size(item, seen) for item in obj)
+	elif hasattr(obj, '__slots__'):
+		size += sum(deep_size(getattr(obj, slot, None), seen) for slot in obj.__slots__)
+	return size
+
+def read_queues(port, attributes=None):
+	""" Reads all Queue MBeans of the stub with one bulk request. """
+	read = {'type': 'read',
+	        'mbean': 'org.apache.activemq:type=Broker,brokerName=localhost,'
+	                 'destinationType=Queue,destinationName=*'}
+	if attributes:
+		read['attribute'] = attributes
+	resp = urllib2.urlopen('http://127.0.0.1:%d/api/jolokia/' % port, json.dumps([read]))
+	return json.loads(resp.read())[0]['value']
+
+def model_sizes(args, port):
+	""" Yields (representation, bytes) of the stub's queues. """
+	plugin = imp.load_source('activemq_nagios_plugin',
+	                         path.join(HERE, path.pardir, 'activemq_nagios_plugin.py'))
+	yield 'all attributes', deep_size(read_queues(port))
+	attributes = [attribute for attribute, _ in plugin.Destination.ATTRIBUTES]
+	values = read_queues(port, attributes)
+	yield 'read attributes', deep_size(values)
+	yield 'Destination records', deep_size(dict((objectName, plugin.Destination(v))
+	                                            for objectName, v in values.items()))
+
+def daemon_rss(args, port):
+	""" Starts the serve daemon and returns its resident memory in kB once
+	    it answers a check from its snapshot. """
+	sock = tempfile.mktemp(prefix='check_activemq-bench-', suffix='.sock')
+	daemon = subprocess.Popen([args.python, args.plugin, '--port', str(port),
+	                           '--daemon-socket', sock, 'serve', '--interval', '3600'])
+	try:
+		for _ in range(600):
+			time.sleep(0.1)
+			client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			try:
+				client.connect(sock)
+				client.sendall(json.dumps(['--port', str(port), 'health']) + '\n')
+				if json.loads(client.makefile().read()).get('exitcode') is not None:
+					break
+			except (IOError, ValueError):
+				pass
+			finally:
+				client.close()
+		with open('/proc/%d/status' % daemon.pid) as f:
+			status = dict(line.split(':', 1) for line in f)
+		return int(status['VmRSS'].split()[0])
+	finally:
+		daemon.terminate()
+		daemon.wait()
+
+def make_parser():
+	parser = argparse.ArgumentParser(description=__doc__,
+		formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--queues', type=int, default=10000,
+		help='Number of queues of the synthetic broker. (default: %(default)s)')
+	parser.add_argument('--python', default=sys.executable,
+		help='Interpreter running the daemon. (default: %(default)s)')
+	parser.add_argument('--plugin', default=path.join(HERE, path.pardir, 'check_activemq.py'),
+		help='The plugin script. (default: check_activemq.py of this checkout)')
+	return parser
+
+def main():
+	args = make_parser().parse_args()
+	args.topics, args.subscribers, args.dlqs = 1, 0, 0
+	args.latency, args.error_rate, args.no_post = 0.0, 0.0, False
+	per10k = 10000.0 / args.queues
+	stub, port = start_stub(args)
+	try:
+		print('%-30s %14s %18s' % ('representation', 'bytes', 'bytes per 10k'))
+		for name, size in model_sizes(args, port):
+			print('%-30s %14d %18d' % (name, size, size * per10k))
+		sys.stdout.flush()
+		rss = daemon_rss(args, port)
+		args.queues = 1
+		small, smallPort = start_stub(args)
+		try:
+			base = daemon_rss(args, smallPort)
+		finally:
+			small.kill()
+			small.wait()
+		print('%-30s %14d %18d' % ('serve daemon RSS (kB)', rss, (rss - base) * per10k))
+	finally:
+		stub.kill()
+		stub.wait()
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 *-*
+
+"""	Benchmarks check_activemq.py against the stub Jolokia agent.
+
+	Starts stub_jolokia.py with a synthetic broker, runs the plugin's modes
+	against it and reports per mode the wall time, the number of requests
+	and bytes the agent answered, and the peak memory (maximum resident set
+	size) of the plugin process. No broker or network access is needed.
+
+	Example: ./benchmarks/run.py --queues 10000 --latency 0.005 queuesize dlq """
+
+import argparse
+import json
+import os
+import os.path as path
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib
+
+HERE = path.dirname(path.abspath(__file__))
+
+# the arguments each mode is benchmarked with; the names exist on the stub
+MODES = [
+	('queuesize', ['queuesize']),
+	('queuesize-top', ['queuesize', '--top', '10']),
+	('topicsize', ['topicsize']),
+	('dlq', ['dlq']),
+	('subscriber', ['subscriber', '--clientId', 'client00001', '--topic', 'topic.00001']),
+	('subscriber-pending', ['subscriber-pending', '--subscription', 'sub00001',
+	                        '--clientId', 'client00001']),
+	('exists', ['exists', '--name', 'queue.00001']),
+	('health', ['health']),
+	('consumers', ['consumers']),
+]
+
+
+def start_stub(args):
+	""" Starts the stub agent in a process of its own, so its memory is
+	    not accounted to the plugin; returns the process and its port. """
+	cmd = [sys.executable, path.join(HERE, 'stub_jolokia.py'), '--port', '0',
+	       '--queues', str(args.queues), '--topics', str(args.topics),
+	       '--subscribers', str(args.subscribers), '--dlqs', str(args.dlqs),
+	       '--latency', str(args.latency), '--error-rate', str(args.error_rate)]
+	if args.no_post:
+		cmd.append('--no-post')
+	stub = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+	port = int(stub.stdout.readline().split()[-1])
+	return stub, port
+
+def stats(port):
+	""" Returns and resets the stub's request and byte counters. """
+	return json.loads(urllib.urlopen('http://127.0.0.1:%d/stats' % port).read())
+
+def run_plugin(args, port, cachedir, modeArgs):
+	""" Runs the plugin once; returns (exitcode, first output line,
+	    wall time, peak RSS in kB). """
+	cmd = ([args.python, args.plugin, '--port', str(port), '--cachedir', cachedir]
+	       + args.plugin_option + modeArgs)
+	env = dict(os.environ)
+	env.setdefault('TIMEOUT', '0') # measure slow modes to their end
+	output = tempfile.TemporaryFile()
+	start = time.time()
+	proc = subprocess.Popen(cmd, stdout=output, env=env)
+	_, status, rusage = os.wait4(proc.pid, 0)
+	wall = time.time() - start
+	proc.returncode = os.WEXITSTATUS(status)
+	output.seek(0)
+	return proc.returncode, output.readline().strip(), wall, rusage.ru_maxrss
+
+def make_parser():
+	parser = argparse.ArgumentParser(description=__doc__,
+		formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('modes', nargs='*', metavar='MODE',
+		help='Modes to benchmark, one of %s. (default: all)'
+		     % ', '.join(name for name, _ in MODES))
+	broker = parser.add_argument_group('Synthetic broker')
+	broker.add_argument('--queues', type=int, default=1000,
+		help='Number of queues. (default: %(default)s)')
+	broker.add_argument('--topics', type=int, default=100,
+		help='Number of topics. (default: %(default)s)')
+	broker.add_argument('--subscribers', type=int, default=100,
+		help='Number of durable topic subscribers. (default: %(default)s)')
+	broker.add_argument('--dlqs', type=int, default=10,
+		help='Number of DLQs. (default: %(default)s)')
+	broker.add_argument('--latency', metavar='SECONDS', type=float, default=0.0,
+		help='Delay of every response. (default: %(default)s)')
+	broker.add_argument('--error-rate', metavar='RATE', type=float, default=0.0,
+		help='Share of requests answered with an error. (default: %(default)s)')
+	broker.add_argument('--no-post', action='store_true',
+		help='Refuse bulk (POST) requests.')
+	plugin = parser.add_argument_group('Plugin')
+	plugin.add_argument('--python', default=sys.executable,
+		help='Interpreter running the plugin. (default: %(default)s)')
+	plugin.add_argument('--plugin', default=path.join(HERE, path.pardir, 'check_activemq.py'),
+		help='The plugin script. (default: check_activemq.py of this checkout)')
+	plugin.add_argument('--plugin-option', metavar='OPTION', action='append', default=[],
+		help='''Option passed to the plugin before the mode, e.g.
+		        --plugin-option=--parallel=8. Can be given several times.''')
+	plugin.add_argument('--repeat', metavar='N', type=int, default=3,
+		help='Runs per mode; the median wall time is reported. (default: %(default)s)')
+	return parser
+
+def main():
+	parser = make_parser()
+	args = parser.parse_args()
+	modes = [(name, modeArgs) for name, modeArgs in MODES
+	         if not args.modes or name in args.modes]
+	unknown = set(args.modes) - set(name for name, _ in MODES)
+	if unknown:
+		parser.error('unknown modes: ' + ', '.join(sorted(unknown)))
+
+	stub, port = start_stub(args)
+	cachedir = tempfile.mkdtemp(prefix='check_activemq-bench-')
+	try:
+		print('%-20s %4s %9s %9s %11s %12s  %s' % ('mode', 'exit', 'wall s',
+			'requests', 'bytes', 'peak RSS kB', 'output'))
+		for name, modeArgs in modes:
+			walls = []
+			for _ in range(args.repeat):
+				stats(port)
+				exitcode, output, wall, maxrss = run_plugin(args, port, cachedir, modeArgs)
+				counters = stats(port)
+				walls.append(wall)
+			walls.sort()
+			print('%-20s %4d %9.3f %9d %11d %12d  %s' % (name, exitcode,
+				walls[len(walls) // 2], counters['requests'], counters['bytes'],
+				maxrss, output[:60]))
+			sys.stdout.flush()
+	finally:
+		stub.kill()
+		stub.wait()
+		shutil.rmtree(cachedir, ignore_errors=True)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 *-*
+
+"""	Measures the cold start of check_activemq.py per mode.
+
+	Every mode is run many times against the stub Jolokia agent with a
+	small broker, so the time is dominated by starting the interpreter,
+	importing modules and building the check. Reported are the fastest and
+	the median wall time and the number of modules the run imports (as
+	counted by python -v), next to an interpreter doing nothing.
+	With --baseline, the plugin of another revision of this repository is
+	measured the same way, and the change of the median is reported.
+	The plugin is run once before it is measured, so its modules are
+	loaded from their .pyc as they are by Nagios.
+
+	Example: ./benchmarks/startup.py --repeat 50 health queuesize
+	         ./benchmarks/startup.py --baseline HEAD~1 """
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from run import HERE, MODES, start_stub, path
+
+# the plugin runs may keep the .pyc of the modules they import
+ENV = dict((k, v) for k, v in os.environ.items() if k != 'PYTHONDONTWRITEBYTECODE')
+
+def timings(cmd, repeat):
+	devnull = open(os.devnull, 'w')
+	subprocess.call(cmd, stdout=devnull, stderr=devnull, env=ENV)
+	walls = []
+	for _ in range(repeat):
+		start = time.time()
+		subprocess.call(cmd, stdout=devnull, stderr=devnull, env=ENV)
+		walls.append(time.time() - start)
+	walls.sort()
+	return walls[0], walls[len(walls) // 2]
+
+def imported_modules(cmd):
+	proc = subprocess.Popen(cmd[:1] + ['-v'] + cmd[1:], stdout=subprocess.PIPE,
+	                        stderr=subprocess.PIPE, env=ENV)
+	_, err = proc.communicate()
+	return len([l for l in err.splitlines() if l.startswith('import ')])
+
+def checkout(revision, directory):
+	""" Extracts the given git revision of this repository into directory
+	    and returns the path of its plugin script. """
+	archive = subprocess.Popen(['git', 'archive', revision], cwd=path.join(HERE, path.pardir),
+	                           stdout=subprocess.PIPE)
+	subprocess.check_call(['tar', '-x', '-C', directory], stdin=archive.stdout)
+	if archive.wait():
+		raise SystemExit('git archive %s FAILED' % revision)
+	return path.join(directory, 'check_activemq.py')
+
+def make_parser():
+	parser = argparse.ArgumentParser(description=__doc__,
+		formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('modes', nargs='*', metavar='MODE',
+		help='Modes to measure, one of %s. (default: all)'
+		     % ', '.join(name for name, _ in MODES))
+	parser.add_argument('--repeat', metavar='N', type=int, default=20,
+		help='Runs per mode. (default: %(default)s)')
+	parser.add_argument('--python', default=sys.executable,
+		help='Interpreter running the plugin. (default: %(default)s)')
+	parser.add_argument('--plugin', default=path.join(HERE, path.pardir, 'check_activemq.py'),
+		help='The plugin script. (default: check_activemq.py of this checkout)')
+	parser.add_argument('--baseline', metavar='REVISION',
+		help='Git revision of this repository to compare the plugin with.')
+	return parser
+
+def main():
+	args = make_parser().parse_args()
+	# the broker of start_stub(), small enough not to matter
+	args.queues, args.topics, args.subscribers, args.dlqs = 10, 2, 2, 1
+	args.latency, args.error_rate, args.no_post = 0.0, 0.0, False
+	basedir = tempfile.mkdtemp(prefix='check_activemq-bench-') if args.baseline else None
+	stub, port = start_stub(args)
+	try:
+		baseplugin = checkout(args.baseline, basedir) if args.baseline else None
+		print('%-20s %10s %10s %8s%s' % ('mode', 'min ms', 'median ms', 'modules',
+			' %12s %8s' % ('base median', 'change') if baseplugin else ''))
+		interpreter = [args.python, '-c', 'pass']
+		fastest, median = timings(interpreter, args.repeat)
+		print('%-20s %10.1f %10.1f %8d' % ('(interpreter)', fastest * 1000,
+			median * 1000, imported_modules(interpreter)))
+		for name, modeArgs in MODES:
+			if args.modes and name not in args.modes:
+				continue
+			cmd = [args.python, args.plugin, '--port', str(port)] + modeArgs
+			fastest, median = timings(cmd, args.repeat)
+			line = '%-20s %10.1f %10.1f %8d' % (name, fastest * 1000,
+				median * 1000, imported_modules(cmd))
+			if baseplugin:
+				_, basemedian = timings([args.python, baseplugin, '--port', str(port)]
+				                        + modeArgs, args.repeat)
+				line += ' %12.1f %+7.0f%%' % (basemedian * 1000,
+					(median / basemedian - 1) * 100)
+			print(line)
+			sys.stdout.flush()
+	finally:
+		stub.kill()
+		stub.wait()
+		if basedir:
+			shutil.rmtree(basedir)
+
+if __name__ == '__main__':
+	main()
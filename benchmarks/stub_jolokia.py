@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 *-*
+
+"""	Stub Jolokia agent serving a synthetic ActiveMQ broker.
+
+	Implements the subset of the Jolokia protocol check_activemq.py uses:
+	GET read (exact names, MBean patterns and attribute lists), GET search
+	and POST bulk requests. Latency and errors can be injected, and the
+	server counts the requests and bytes it answered; GET /stats returns
+	and resets the counters. """
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib
+import fnmatch
+import BaseHTTPServer
+import SocketServer
+
+DOMAIN = 'org.apache.activemq'
+
+# attributes we never read but a real broker always sends along
+FILLER = dict(('Filler%02d' % i, 'x' * 24) for i in range(30))
+
+
+def canonical(props):
+	return DOMAIN + ':' + ','.join('%s=%s' % kv for kv in sorted(props.items()))
+
+def parse_name(name):
+	domain, _, keys = name.partition(':')
+	props = {}
+	for part in keys.split(','):
+		if part == '*':
+			props['*'] = True
+		elif part:
+			k, _, v = part.partition('=')
+			props[k] = v
+	return domain, props
+
+
+class Broker(object):
+	""" Synthetic broker holding every MBean by its canonical name. """
+
+	def __init__(self, name='localhost', queues=100, topics=10,
+	             subscribers=10, dlqs=5, seed=0):
+		rnd = random.Random(seed)
+		self.name = name
+		self.mbeans = {}
+		self.lists = {'Queues': [], 'Topics': [], 'TopicSubscribers': [],
+		              'InactiveDurableTopicSubscribers': []}
+
+		def dest(kind, dname, size):
+			props = {'type': 'Broker', 'brokerName': name,
+			         'destinationType': kind, 'destinationName': dname}
+			attrs = dict(FILLER)
+			enq = rnd.randint(size, size + 10000)
+			attrs.update({'Name': dname, 'QueueSize': size,
+			              'ConsumerCount': rnd.randint(0, 3),
+			              'ProducerCount': rnd.randint(0, 3),
+			              'EnqueueCount': enq, 'DequeueCount': enq - size,
+			              'InFlightCount': rnd.randint(0, 5),
+			              'Subscriptions': []})
+			oname = canonical(props)
+			self.mbeans[oname] = attrs
+			self.lists[kind + 's'].append({'objectName': oname})
+			return attrs
+
+		for i in range(queues):
+			dest('Queue', 'queue.%05d' % i, rnd.randint(0, 50))
+		for i in range(dlqs):
+			dest('Queue', 'ActiveMQ.DLQ.queue.%05d' % i, rnd.randint(0, 5))
+		topics_attrs = [dest('Topic', 'topic.%05d' % i, rnd.randint(0, 50))
+		                for i in range(max(topics, 1))]
+		for i in range(subscribers):
+			tattrs = topics_attrs[i % len(topics_attrs)]
+			active = i % 4 != 0
+			props = {'type': 'Broker', 'brokerName': name,
+			         'destinationType': 'Topic',
+			         'destinationName': tattrs['Name'],
+			         'endpoint': 'Consumer', 'clientId': 'client%05d' % i,
+			         'consumerId': 'Durable(client%05d_sub%05d)' % (i, i)}
+			oname = canonical(props)
+			self.mbeans[oname] = {
+				'ClientId': 'client%05d' % i,
+				'SubscriptionName': 'sub%05d' % i,
+				'DestinationName': tattrs['Name'],
+				'Active': active,
+				'PendingQueueSize': rnd.randint(0, 20)}
+			tattrs['Subscriptions'].append({'objectName': oname})
+			self.lists['TopicSubscribers' if active
+			           else 'InactiveDurableTopicSubscribers'].append(
+				{'objectName': oname})
+
+		self.mbeans[canonical({'type': 'Broker', 'brokerName': name,
+		                       'service': 'Health'})] = {
+			'CurrentStatus': 'Good'}
+		broker = dict(FILLER)
+		broker.update(self.lists)
+		self.mbeans[canonical({'type': 'Broker', 'brokerName': name})] = broker
+
+	def search(self, pattern):
+		domain, pprops = parse_name(pattern)
+		wild = pprops.pop('*', False)
+		names = []
+		for oname in self.mbeans:
+			_, props = parse_name(oname)
+			if not wild and set(props) != set(pprops):
+				continue
+			if all(k in props and fnmatch.fnmatchcase(props[k], v)
+			       for k, v in pprops.items()):
+				names.append(oname)
+		return sorted(names)
+
+	def read(self, mbean, attributes=None):
+		def select(attrs):
+			if not attributes:
+				return attrs
+			return dict((a, attrs[a]) for a in attributes if a in attrs)
+
+		if '*' in mbean or '?' in mbean:
+			names = self.search(mbean)
+			if not names:
+				return error(404, 'javax.management.InstanceNotFoundException',
+				             'No MBean with pattern %s found' % mbean)
+			return {'status': 200,
+			        'value': dict((n, select(self.mbeans[n])) for n in names)}
+		_, props = parse_name(mbean)
+		attrs = self.mbeans.get(canonical(props))
+		if attrs is None:
+			return error(404, 'javax.management.InstanceNotFoundException',
+			             mbean)
+		if attributes and len(attributes) == 1:
+			return {'status': 200, 'value': attrs.get(attributes[0])}
+		return {'status': 200, 'value': select(attrs)}
+
+
+def error(status, error_type, msg):
+	return {'status': status, 'error_type': error_type,
+	        'error': error_type + ' : ' + msg}
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+	wbufsize = -1 # one write per response, no Nagle stalls on keep-alive
+
+	def log_message(self, *args):
+		pass
+
+	def reply(self, obj, code=200):
+		stub = self.server
+		if stub.latency:
+			time.sleep(stub.latency)
+		if stub.error_rate and stub.random.random() < stub.error_rate:
+			code, obj = 503, error(503, 'Unavailable', 'injected error')
+		body = json.dumps(obj)
+		with stub.lock:
+			stub.requests += 1
+			stub.bytes += len(body)
+		self.send_response(code)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self):
+		path = urllib.unquote(self.path)
+		if path == '/stats':
+			stats = {'requests': self.server.requests, 'bytes': self.server.bytes}
+			self.server.reset()
+			body = json.dumps(stats)
+			self.send_response(200)
+			self.send_header('Content-Length', str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+			return
+		broker = self.server.broker
+		for op in ('/read/', '/search/'):
+			if op in path:
+				rest = path.split(op, 1)[1]
+				break
+		else:
+			return self.reply(error(400, 'IllegalArgument', path), 400)
+		if op == '/search/':
+			return self.reply({'status': 200, 'value': broker.search(rest)})
+		mbean, _, attrs = rest.partition('/')
+		self.reply(broker.read(mbean, attrs.split(',') if attrs else None))
+
+	def do_POST(self):
+		body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+		if self.server.no_post:
+			self.reply(error(405, 'MethodNotAllowed', 'POST disabled'), 405)
+			return
+		reqs = json.loads(body)
+		single = isinstance(reqs, dict)
+		resps = []
+		for req in ([reqs] if single else reqs):
+			if req.get('type') == 'search':
+				resp = {'status': 200,
+				        'value': self.server.broker.search(req['mbean'])}
+			else:
+				attrs = req.get('attribute')
+				if attrs is not None and not isinstance(attrs, list):
+					attrs = [attrs]
+				resp = self.server.broker.read(req['mbean'], attrs)
+			resp['request'] = req
+			resps.append(resp)
+		self.reply(resps[0] if single else resps)
+
+
+class StubJolokia(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+	def __init__(self, broker, port=0, latency=0.0, error_rate=0.0,
+	             no_post=False):
+		BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port), Handler)
+		self.broker = broker
+		self.latency = latency
+		self.error_rate = error_rate
+		self.no_post = no_post
+		self.random = random.Random(1)
+		self.lock = threading.Lock()
+		self.reset()
+
+	def handle_error(self, request, client_address):
+		pass # clients going away mid keep-alive are expected
+
+	def reset(self):
+		self.requests = 0
+		self.bytes = 0
+
+	@property
+	def url(self):
+		return 'http://127.0.0.1:%d/api/jolokia/read/' % self.server_address[1]
+
+	def start(self):
+		thread = threading.Thread(target=self.serve_forever)
+		thread.daemon = True
+		thread.start()
+		return self
+
+
+def make_parser():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument('--port', type=int, default=8161,
+		help='Port to listen on, 0 picks a free one. (default: %(default)s)')
+	parser.add_argument('--brokerName', default='localhost',
+		help='Name of the broker. (default: %(default)s)')
+	parser.add_argument('--queues', type=int, default=100,
+		help='Number of queues. (default: %(default)s)')
+	parser.add_argument('--topics', type=int, default=10,
+		help='Number of topics. (default: %(default)s)')
+	parser.add_argument('--subscribers', type=int, default=10,
+		help='Number of durable topic subscribers. (default: %(default)s)')
+	parser.add_argument('--dlqs', type=int, default=5,
+		help='Number of queues named ActiveMQ.DLQ.*. (default: %(default)s)')
+	parser.add_argument('--latency', metavar='SECONDS', type=float, default=0.0,
+		help='Delay of every response. (default: %(default)s)')
+	parser.add_argument('--error-rate', metavar='RATE', type=float, default=0.0,
+		help='Share of requests answered with an error. (default: %(default)s)')
+	parser.add_argument('--no-post', action='store_true',
+		help='Refuse bulk (POST) requests like a restricted agent.')
+	return parser
+
+
+if __name__ == '__main__':
+	args = make_parser().parse_args()
+	broker = Broker(args.brokerName, queues=args.queues, topics=args.topics,
+	                subscribers=args.subscribers, dlqs=args.dlqs)
+	server = StubJolokia(broker, port=args.port, latency=args.latency,
+	                     error_rate=args.error_rate, no_post=args.no_post)
+	# tells a parent process that (and where) the server listens
+	print('listening on %d' % server.server_address[1])
+	sys.stdout.flush()
+	server.serve_forever()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 *-*
+
+"""	Tests the streaming decoder loadJsonMembers() of activemq_nagios_plugin.py.
+
+	Responses as sent by a Jolokia agent are fed to it in chunks of one
+	byte, of odd sizes and all at once, and what it yields is compared
+	with the members found in the whole response by json.loads().
+
+	Run: python -m unittest discover -s tests """
+
+import collections
+import json
+import os.path as path
+import sys
+import unittest
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), path.pardir))
+import activemq_nagios_plugin as plugin
+
+# a search of the destinations of a broker
+SEARCH = r'''{"request":{"mbean":"org.apache.activemq:brokerName=localhost,destinationName=*,destinationType=Queue,type=Broker","type":"search"},"value":["org.apache.activemq:brokerName=localhost,destinationName=orders,destinationType=Queue,type=Broker","org.apache.activemq:brokerName=localhost,destinationName=ActiveMQ.DLQ.orders,destinationType=Queue,type=Broker","org.apache.activemq:brokerName=localhost,destinationName=Bestellungen.\u00c4nderungen,destinationType=Queue,type=Broker"],"timestamp":1729267200,"status":200}'''
+
+# a bulk read of the Queue MBeans with some of their attributes; json-simple
+# escapes slashes and sends non-ASCII characters as they are
+BULK_READ = r'''[{"request":{"mbean":"org.apache.activemq:brokerName=localhost,destinationName=*,destinationType=Queue,type=Broker","attribute":["Name","QueueSize","ConsumerCount","DequeueCount"],"type":"read"},"value":{"org.apache.activemq:brokerName=localhost,destinationName=orders,destinationType=Queue,type=Broker":{"Name":"orders","QueueSize":12,"ConsumerCount":2,"DequeueCount":104857},"org.apache.activemq:brokerName=localhost,destinationName=ActiveMQ.DLQ.orders,destinationType=Queue,type=Broker":{"Name":"ActiveMQ.DLQ.orders","QueueSize":0,"ConsumerCount":0,"DequeueCount":0},"org.apache.activemq:brokerName=localhost,destinationName=in\/bound \"x\",destinationType=Queue,type=Broker":{"Name":"in\/bound \"x\"","QueueSize":3,"ConsumerCount":1,"DequeueCount":7},"org.apache.activemq:brokerName=localhost,destinationName=Bestellungen.Änderungen,destinationType=Queue,type=Broker":{"Name":"Bestellungen.Änderungen","QueueSize":1.5E3,"ConsumerCount":null,"DequeueCount":-1}},"timestamp":1729267200,"status":200}]'''.replace('Ä', '\xc3\x84')
+
+# a bulk read matching no MBean
+NOT_FOUND = r'''[{"request":{"mbean":"org.apache.activemq:brokerName=localhost,destinationName=nope*,destinationType=Queue,type=Broker","attribute":["Name","QueueSize"],"type":"read"},"stacktrace":"javax.management.InstanceNotFoundException: No MBean found for \"value\": \"status\":\n\tat org.jolokia.handler.ReadHandler.doHandleRequest(ReadHandler.java:110)\n\tat C:\\jolokia\\","error_type":"javax.management.InstanceNotFoundException","error":"javax.management.InstanceNotFoundException : No MBean with pattern org.apache.activemq:brokerName=localhost,destinationName=nope*,destinationType=Queue,type=Broker found for reading attributes","status":404}]'''
+
+# a read of the Broker MBean, pretty-printed
+BROKER = '''{
+  "request" : {
+    "mbean" : "org.apache.activemq:brokerName=localhost,type=Broker",
+    "attribute" : [ "Queues", "Topics", "BrokerVersion" ],
+    "type" : "read"
+  },
+  "value" : {
+    "Queues" : [ {
+      "objectName" : "org.apache.activemq:brokerName=localhost,destinationName=orders,destinationType=Queue,type=Broker"
+    }, {
+      "objectName" : "org.apache.activemq:brokerName=localhost,destinationName=ActiveMQ.DLQ.orders,destinationType=Queue,type=Broker"
+    } ],
+    "Topics" : [ ],
+    "BrokerVersion" : "5.15.16"
+  },
+  "timestamp" : 1729267200,
+  "status" : 200
+}
+'''
+
+CHUNK_SIZES = [1, 2, 3, 5, 7, 13, 64, 65, 1000, 65536]
+
+
+class ChunkedResponse(object):
+	""" Sends body in chunks of size bytes, whatever is asked for. """
+	def __init__(self, body, size):
+		self.body = body
+		self.size = size
+		self.pos = 0
+		self.closed = False
+
+	def read(self, amount=-1):
+		chunk = self.body[self.pos:self.pos + self.size]
+		self.pos += len(chunk)
+		return chunk
+
+	def close(self):
+		self.closed = True
+
+class ChunkedTransport(object):
+	""" Stands in for CONNECTIONS, answering every request with body. """
+	def __init__(self, body, size):
+		self.body = body
+		self.size = size
+		self.responses = []
+
+	def open(self, srcurl, data=None):
+		self.responses.append(ChunkedResponse(self.body, self.size))
+		return self.responses[-1]
+
+def members(document, keys):
+	""" The (key, entry) loadJsonMembers() is to yield for document,
+	    found by walking the whole of it. """
+	if isinstance(document, list):
+		for item in document:
+			for member in members(item, keys):
+				yield member
+	elif isinstance(document, dict):
+		for name, value in document.items():
+			if name not in keys:
+				for member in members(value, keys):
+					yield member
+			elif isinstance(value, list):
+				for entry in value:
+					yield name, entry
+			elif isinstance(value, dict):
+				for entry in value.items():
+					yield name, entry
+			else:
+				yield name, value
+
+
+class LoadJsonMembersTest(unittest.TestCase):
+
+	def setUp(self):
+		self.connections = plugin.CONNECTIONS
+
+	def tearDown(self):
+		plugin.CONNECTIONS = self.connections
+
+	def check(self, body, *keys):
+		expected = list(members(json.loads(body, object_pairs_hook=collections.OrderedDict),
+		                        keys))
+		self.assertTrue(expected)
+		for size in CHUNK_SIZES:
+			plugin.CONNECTIONS = ChunkedTransport(body, size)
+			found = list(plugin.loadJsonMembers('http://localhost:8161/api/jolokia/', None, *keys))
+			self.assertEqual(found, expected, 'in chunks of %d bytes' % size)
+			self.assertTrue(plugin.CONNECTIONS.responses[0].closed)
+
+	def test_search(self):
+		self.check(SEARCH, 'value', 'status')
+
+	def test_bulk_read(self):
+		self.check(BULK_READ, 'value', 'status', 'error_type')
+
+	def test_not_found(self):
+		self.check(NOT_FOUND, 'value', 'status', 'error_type')
+
+	def test_pretty_printed(self):
+		self.check(BROKER, 'Queues', 'Topics', 'BrokerVersion')
+
+	def test_scalars(self):
+		self.check(BULK_READ, 'Name', 'QueueSize', 'ConsumerCount', 'DequeueCount')
+
+	def test_truncated(self):
+		for size in CHUNK_SIZES:
+			plugin.CONNECTIONS = ChunkedTransport(BULK_READ[:-40], size)
+			with self.assertRaises(ValueError):
+				list(plugin.loadJsonMembers('http://localhost:8161/api/jolokia/', None, 'value'))
+			self.assertTrue(plugin.CONNECTIONS.responses[0].closed)
+
+	def test_missing_list(self):
+		plugin.CONNECTIONS = ChunkedTransport(BROKER, 7)
+		with self.assertRaises(KeyError):
+			list(plugin.loadJsonLists('http://localhost:8161/api/jolokia/read/', 'Queues', 'Subscribers'))
+
+
+if __name__ == '__main__':
+	unittest.main()